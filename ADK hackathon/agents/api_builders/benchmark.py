@@ -0,0 +1,277 @@
+"""Offline benchmark of the api_creator_agent pipeline.
+
+Replays the whole pipeline with a scripted fake LLM, a fake openapi-generator command and a fake GitLab project, and
+reports the latency of every agent, LLM call, tool and subprocess. No cloud access is needed, but importing the
+package builds the `adk web` root agent, which needs `LLM_MODEL` to be set (any model name, the LLMs are replaced):
+
+    LLM_MODEL=fake-llm python -m api_builders.benchmark --runs 5 --llm-latency 0.5 --output benchmark.json
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from api_builders import deployer
+from api_builders.coders import get_output_directory
+from api_builders.pm import ApiCreatorAgent
+from api_builders.tracing import OtlpJsonFileSpanExporter, get_tracer_provider
+
+APP_NAME = "api_builders_benchmark"
+USER_ID = "benchmark"
+
+API_NAME = "benchmark_api"
+API_VERSION = "1.0.0"
+SDK_LANGUAGES = ["go", "java", "python", "ruby"]
+
+REQUIREMENTS = "Build a Pet Store API with an endpoint to list the pets."
+
+SPEC = """openapi: 3.0.3
+info:
+  title: Benchmark API
+  version: 1.0.0
+paths:
+  /pets:
+    get:
+      summary: List all pets
+      responses:
+        '200':
+          description: A list of pets
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  type: string
+"""
+
+FAKE_GENERATOR = """#!{python}
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+output = args[args.index("-o") + 1]
+generator = args[args.index("-g") + 1]
+time.sleep(float(os.getenv("FAKE_GENERATOR_LATENCY", "0")))
+os.makedirs(output, exist_ok=True)
+for i in range(int(os.getenv("FAKE_GENERATOR_FILES", "20"))):
+    with open(os.path.join(output, f"file_{{i}}.txt"), "w") as f:
+        f.write(f"{{generator}} generated file {{i}}\\n" * 50)
+"""
+
+
+class FakeLlm(BaseLlm):
+    """Scripted LLM: calls the scripted tools, then answers with `text` or with the result of the tools."""
+    tool_calls: List[Tuple[str, Dict]] = []
+    text: Optional[str] = None
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+        last_parts = llm_request.contents[-1].parts if llm_request.contents else []
+        function_responses = [part.function_response.response for part in last_parts or [] if part.function_response]
+
+        if self.tool_calls and not function_responses:
+            parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in self.tool_calls]
+        elif self.text is not None:
+            parts = [types.Part(text=self.text)]
+        elif len(function_responses) == 1 and "result" in function_responses[0]:
+            parts = [types.Part(text=str(function_responses[0]["result"]))]
+        else:
+            parts = [types.Part(text=json.dumps(function_responses))]
+
+        prompt_chars = sum(len(part.text or "") for content in llm_request.contents for part in content.parts or [])
+        output_chars = sum(len(part.text or json.dumps(part.function_call.args)) for part in parts)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=output_chars // 4,
+            ),
+        )
+
+
+class FakeGitlabProject:
+    """In-memory GitLab project with just the API used by the deployer. Merge requests are merged right away."""
+    web_url = "https://gitlab.example.com/benchmark/project"
+    default_branch = "main"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.files: Dict[str, Dict[str, bytes]] = {"main": {}}
+        self.commits_count = 0
+        self.merge_requests: List[dict] = []
+        self.branches = SimpleNamespace(create=self._create_branch)
+        self.commits = SimpleNamespace(create=self._create_commit)
+        self.mergerequests = SimpleNamespace(create=self._create_merge_request)
+
+    def repository_tree(self, path: str, ref: str, recursive: bool = False, get_all: bool = False) -> List[dict]:
+        time.sleep(self.latency)
+        return [
+            {
+                "path": file_path,
+                "type": "blob",
+                "id": hashlib.sha1(f"blob {len(content)}\0".encode("utf-8") + content).hexdigest(),
+            }
+            for file_path, content in self.files[ref].items() if file_path.startswith(f"{path}/")
+        ]
+
+    def _create_branch(self, data: dict):
+        self.files[data["branch"]] = dict(self.files[data["ref"]])
+
+    def _create_commit(self, data: dict):
+        time.sleep(self.latency)
+        files = self.files[data["branch"]]
+        for action in data["actions"]:
+            if action["action"] == "delete":
+                files.pop(action["file_path"])
+            elif action.get("encoding") == "base64":
+                files[action["file_path"]] = base64.b64decode(action["content"])
+            else:
+                files[action["file_path"]] = action["content"].encode("utf-8")
+        self.commits_count += 1
+        sha = hashlib.sha1(f"{data['branch']}-{self.commits_count}".encode("utf-8")).hexdigest()
+        return SimpleNamespace(id=sha, short_id=sha[:8])
+
+    def _create_merge_request(self, data: dict):
+        self.files[data["target_branch"]] = self.files.pop(data["source_branch"])
+        self.merge_requests.append(data)
+        return SimpleNamespace(web_url=f"{self.web_url}/-/merge_requests/{len(self.merge_requests)}")
+
+
+def get_llm_scripts(spec_file_path: str) -> Dict[str, dict]:
+    generated_directories = [get_output_directory("server-stub", "python-fastapi", API_NAME, API_VERSION)]
+    generated_directories += [
+        get_output_directory("client-sdk", language, API_NAME, API_VERSION) for language in SDK_LANGUAGES
+    ]
+    generated_directories += [get_output_directory("documentation", "html2", API_NAME, API_VERSION)]
+    generation_args = {"spec_file_path": spec_file_path, "api_name": API_NAME, "api_version": API_VERSION}
+
+    return {
+        "openapi_implementor": {"text": SPEC},
+        "openapi_validator": {
+            "tool_calls": [("validate_openapi_spec", {"openapi_definition": SPEC})],
+            "text": "The OpenAPI specification is valid",
+        },
+        "openapi_saver": {"tool_calls": [("save_yaml_file", {"openapi_definition": SPEC, "api_name": API_NAME})]},
+        "openapi_stub_generator": {
+            "tool_calls": [("generate_server_stub", {**generation_args, "generation_framework": "python-fastapi"})],
+        },
+        "openapi_sdk_generator": {
+            "tool_calls": [
+                ("generate_client_sdk", {**generation_args, "generation_framework": language})
+                for language in SDK_LANGUAGES
+            ],
+        },
+        "openapi_docs_generator": {
+            "tool_calls": [("generate_documentation", {**generation_args, "generation_framework": "html2"})],
+        },
+        "commit_code_generator": {"text": f"The OpenAPI resources are in {', '.join(generated_directories)}"},
+        "deployer": {"tool_calls": [("automate_gitlab_commit", {"directories_names": generated_directories})]},
+    }
+
+def use_fake_llm(agent: BaseAgent, scripts: Dict[str, dict], latency: float):
+    if isinstance(agent, LlmAgent):
+        agent.model = FakeLlm(model="fake-llm", latency=latency, **scripts[agent.name])
+    for sub_agent in agent.sub_agents:
+        use_fake_llm(sub_agent, scripts, latency)
+
+async def run_pipeline(llm_latency: float, gitlab_latency: float):
+    project = FakeGitlabProject(gitlab_latency)
+    deployer.get_project = lambda: project
+
+    agent = ApiCreatorAgent.get_agent()
+    use_fake_llm(agent, get_llm_scripts(os.path.join(os.getenv("API_REQUIREMENTS_PATH"), API_NAME, "swagger.yaml")), llm_latency)
+
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name=APP_NAME, agent=agent, session_service=session_service, artifact_service=InMemoryArtifactService()
+    )
+    session = await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, state={"api_requirements": REQUIREMENTS}
+    )
+    message = types.Content(role="user", parts=[types.Part(text=REQUIREMENTS)])
+    async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+        pass
+
+    session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    if project.commits_count == 0 or not project.merge_requests:
+        raise RuntimeError(f"The pipeline did not deploy to GitLab, final state: {session.state}")
+
+def summarize(spans) -> Dict[str, dict]:
+    durations: Dict[str, List[float]] = {}
+    for span in sorted(spans, key=lambda s: s.start_time):
+        durations.setdefault(span.name, []).append((span.end_time - span.start_time) / 1e6)
+    return {
+        name: {
+            "count": len(values),
+            "mean_ms": statistics.mean(values),
+            "p50_ms": statistics.median(values),
+            "max_ms": max(values),
+        }
+        for name, values in durations.items()
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the api_creator_agent pipeline with fake services")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds added to every fake LLM call")
+    parser.add_argument("--generator-latency", type=float, default=0.0, help="Seconds added to every generator run")
+    parser.add_argument("--generator-files", type=int, default=20, help="Files written by every generator run")
+    parser.add_argument("--gitlab-latency", type=float, default=0.0, help="Seconds added to every GitLab request")
+    parser.add_argument("--trace-file", help="Also export the spans to this OTLP JSON file")
+    parser.add_argument("--output", help="Write the per-stage summary to this JSON file")
+    parser.add_argument("--max-seconds", type=float, help="Fail if the mean pipeline latency is above this value")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        generator_path = os.path.join(workdir, "fake-openapi-generator")
+        with open(generator_path, "w") as f:
+            f.write(FAKE_GENERATOR.format(python=sys.executable))
+        os.chmod(generator_path, 0o755)
+
+        os.environ["OPENAPI_COMMAND"] = generator_path
+        os.environ["FAKE_GENERATOR_LATENCY"] = str(args.generator_latency)
+        os.environ["FAKE_GENERATOR_FILES"] = str(args.generator_files)
+        os.environ["API_STATE_PATH"] = os.path.join(workdir, "state")
+
+        # ADK reports the agent, LLM call and tool spans to the global tracer provider
+        span_exporter = InMemorySpanExporter()
+        get_tracer_provider().add_span_processor(SimpleSpanProcessor(span_exporter))
+        if args.trace_file:
+            get_tracer_provider().add_span_processor(SimpleSpanProcessor(OtlpJsonFileSpanExporter(args.trace_file)))
+        for run in range(args.runs):
+            os.environ["API_REQUIREMENTS_PATH"] = os.path.join(workdir, f"run_{run}")
+            asyncio.run(run_pipeline(args.llm_latency, args.gitlab_latency))
+
+    summary = summarize(span_exporter.get_finished_spans())
+    print(f"{'stage':<55}{'count':>7}{'mean ms':>12}{'p50 ms':>12}{'max ms':>12}")
+    for name, stats in summary.items():
+        print(f"{name:<55}{stats['count']:>7}{stats['mean_ms']:>12.1f}{stats['p50_ms']:>12.1f}{stats['max_ms']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    pipeline_ms = summary["agent_run [api_creator_agent]"]["mean_ms"]
+    if args.max_seconds is not None and pipeline_ms > args.max_seconds * 1000:
+        print(f"Mean pipeline latency {pipeline_ms / 1000:.2f}s is above the {args.max_seconds:.2f}s limit")
+        sys.exit(1)
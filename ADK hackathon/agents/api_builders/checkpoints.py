@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import AsyncGenerator, Callable, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.sessions import DatabaseSessionService
+
+
+def get_state_path() -> str:
+    path = os.getenv("API_STATE_PATH", os.path.join(os.getenv("API_REQUIREMENTS_PATH", "."), ".adk_state"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class CheckpointStore:
+    """SQLite store with the outputs of every completed stage of a run."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stage_checkpoints (
+                    run_id TEXT NOT NULL,
+                    app_name TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    outputs TEXT NOT NULL,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, stage, input_hash)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def load_stage(self, run_id: str, stage: str, input_hash: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT outputs FROM stage_checkpoints WHERE run_id = ? AND stage = ? AND input_hash = ?",
+                (run_id, stage, input_hash)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_stage(self, run_id: str, app_name: str, user_id: str, stage: str, input_hash: str, outputs: Dict):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO stage_checkpoints
+                    (run_id, app_name, user_id, stage, input_hash, outputs, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (run_id, app_name, user_id, stage, input_hash, json.dumps(outputs), time.time())
+            )
+
+    def list_runs(self) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT run_id, app_name, user_id, GROUP_CONCAT(DISTINCT stage), MAX(completed_at)
+                FROM stage_checkpoints GROUP BY run_id, app_name, user_id ORDER BY MAX(completed_at) DESC
+            """).fetchall()
+        return [{"run_id": run_id, "app_name": app_name, "user_id": user_id, "stages": stages.split(","),
+                 "updated_at": updated_at}
+                for run_id, app_name, user_id, stages, updated_at in rows]
+
+    def delete_run(self, run_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM stage_checkpoints WHERE run_id = ?", (run_id,))
+
+    def garbage_collect(self, max_age_days: float) -> List[Dict]:
+        """Deletes the runs without activity in the last `max_age_days` days and returns them."""
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        expired = [run for run in self.list_runs() if run["updated_at"] < cutoff]
+        for run in expired:
+            self.delete_run(run["run_id"])
+        return expired
+
+
+_checkpoint_store: Optional[CheckpointStore] = None
+
+def get_checkpoint_store() -> CheckpointStore:
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore(
+            os.getenv("API_CHECKPOINT_DB", os.path.join(get_state_path(), "checkpoints.db"))
+        )
+    return _checkpoint_store
+
+
+class CheckpointAgent(BaseAgent):
+    """Runs its only sub-agent once per run, replaying the saved outputs on later invocations.
+
+    Checkpoints are keyed on the session id and a hash of the `input_keys` of the session state. With a durable
+    session service a restarted pipeline resumes from the first stage that did not finish, while a stage whose inputs
+    changed (e.g. the user revised the API) runs again. Stages whose inputs are missing are never checkpointed.
+
+    The `reset_keys` are cleared before the stage runs, so the values left by a previous run cannot make
+    `is_completed` (called with the session state) accept a stage that failed this time. A saved stage is only replayed
+    if `is_completed` still accepts its outputs, e.g. the files it generated were not lost with the container.
+    """
+    output_keys: List[str]
+    input_keys: List[str]
+    reset_keys: List[str] = []
+    is_completed: Optional[Callable[[Dict], bool]] = None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        store = get_checkpoint_store()
+        run_id = ctx.session.id
+        stage = self.sub_agents[0]
+
+        inputs = {key: ctx.session.state.get(key) for key in self.input_keys}
+        if any(value in (None, "") for value in inputs.values()):
+            input_hash = None
+        else:
+            input_hash = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+        outputs = store.load_stage(run_id, stage.name, input_hash) if input_hash else None
+        if outputs is not None:
+            if self.is_completed is None or self.is_completed({**ctx.session.state, **outputs}):
+                print(f"Stage '{stage.name}' already completed for run {run_id}. Skipping.")
+                yield Event(author=self.name, actions=EventActions(state_delta=outputs))
+                return
+            print(f"Stage '{stage.name}' of run {run_id} was completed but its results are gone. Running it again.")
+
+        if self.reset_keys:
+            yield Event(author=self.name, actions=EventActions(state_delta={key: None for key in self.reset_keys}))
+
+        async for event in stage.run_async(ctx):
+            yield event
+
+        outputs = {key: ctx.session.state.get(key) for key in self.output_keys}
+        if input_hash is None or any(value in (None, "") for value in outputs.values()):
+            return
+        if self.is_completed is None or self.is_completed(ctx.session.state):
+            store.save_stage(run_id, ctx.session.app_name, ctx.session.user_id, stage.name, input_hash, outputs)
+
+    @staticmethod
+    def wrap(agent: BaseAgent, output_keys: List[str], input_keys: List[str], reset_keys: List[str] = None,
+             is_completed: Optional[Callable[[Dict], bool]] = None) -> "CheckpointAgent":
+        return CheckpointAgent(
+            name=f"{agent.name}_checkpoint",
+            sub_agents=[agent],
+            output_keys=output_keys,
+            input_keys=input_keys,
+            reset_keys=reset_keys or [],
+            is_completed=is_completed,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and clean the api_creator_agent checkpoints")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the runs with completed stages")
+    gc_parser = subparsers.add_parser("gc", help="Delete the runs older than the given number of days")
+    gc_parser.add_argument("--days", type=float, default=7)
+    gc_parser.add_argument("--session-db-url", default=os.getenv("SESSION_DB_URL"),
+                           help="Session database used by adk web, its sessions are deleted with the runs")
+    args = parser.parse_args()
+
+    checkpoint_store = get_checkpoint_store()
+    if args.command == "list":
+        for run in checkpoint_store.list_runs():
+            updated_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["updated_at"]))
+            print(f"{run['run_id']}\t{updated_at}\t{', '.join(run['stages'])}")
+    else:
+        if not args.session_db_url:
+            print("Warning: no session database given, only the checkpoints will be deleted")
+        session_service = DatabaseSessionService(db_url=args.session_db_url) if args.session_db_url else None
+        for expired_run in checkpoint_store.garbage_collect(args.days):
+            if session_service is not None:
+                asyncio.run(session_service.delete_session(
+                    app_name=expired_run["app_name"], user_id=expired_run["user_id"], session_id=expired_run["run_id"]
+                ))
+            print(f"Deleted run {expired_run['run_id']}")
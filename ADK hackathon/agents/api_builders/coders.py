@@ -1,6 +1,11 @@
 import os
 import subprocess
+from typing import List
+
 from google.adk.agents import LlmAgent, SequentialAgent, ParallelAgent
+from google.adk.tools import ToolContext
+
+from api_builders.tracing import subprocess_span
 
 CODE_GENERATION_DESCRIPTION = """
 This agent transforms a validated OpenAPI specification into functional code by generating server-side API stubs and 
@@ -45,8 +50,18 @@ def save_yaml_file(openapi_definition: str, api_name: str) -> str:
         f.write(openapi_definition)
     return file_path
 
+# Frameworks of every component asked by the generation instructions, all of them must be generated to complete a run
+GENERATED_FRAMEWORKS = {
+    "server-stub": ["python-fastapi"],
+    "client-sdk": ["go", "java", "python", "ruby"],
+    "documentation": ["html2"],
+}
+
+def get_output_directory(component: str, generation_framework: str, api_name: str, api_version: str) -> str:
+    return f"{api_name}_{component}_{generation_framework}_v{api_version}".lower().replace(' ', '_').replace('-', '_')
+
 def _generate_openapi_component(component: str, spec_file_path: str, generation_framework: str, api_name: str, api_version: str) -> dict:
-    output_directory = f"{api_name}_{component}_{generation_framework}_v{api_version}".lower().replace(' ', '_').replace('-', '_')
+    output_directory = get_output_directory(component, generation_framework, api_name, api_version)
 
     try:
         command = [
@@ -55,7 +70,8 @@ def _generate_openapi_component(component: str, spec_file_path: str, generation_
             "-g", generation_framework,
             "-o", f"{os.getenv('API_REQUIREMENTS_PATH')}/{output_directory}"
         ]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        with subprocess_span("openapi_generator", {"openapi.component": component, "openapi.generator": generation_framework}):
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
         # print(f"OpenAPI Generator Output:\n{result.stdout}")
         # print(f"OpenAPI Generator Errors (if any):\n{result.stderr}")
 
@@ -76,7 +92,19 @@ def _generate_openapi_component(component: str, spec_file_path: str, generation_
             'message': f"An unexpected error occurred: {str(e)}"
         }
 
-def generate_server_stub(spec_file_path: str, generation_framework: str, api_name: str, api_version: str) -> dict:
+def get_generation_key(component: str, generation_framework: str) -> str:
+    return f"generated:{component}:{generation_framework}"
+
+def _record_generation(tool_context: ToolContext, component: str, generation_framework: str, result: dict) -> dict:
+    # The tool calls of a single model response are merged in one event that keeps the state delta of only one of
+    # them, so every call writes its own key instead of appending to a shared list
+    tool_context.state[get_generation_key(component, generation_framework)] = {
+        "status": result["status"],
+        "path": result.get("path"),
+    }
+    return result
+
+def generate_server_stub(spec_file_path: str, generation_framework: str, api_name: str, api_version: str, tool_context: ToolContext) -> dict:
     """Generates a server stub from an OpenAPI specification using openapi-generator-cli.
 
     Args:
@@ -84,15 +112,17 @@ def generate_server_stub(spec_file_path: str, generation_framework: str, api_nam
         generation_framework (str): The target stub language (e.g., "python", "java", "typescript-angular", "go").
         api_name (str): The name of the API.
         api_version (str): The target API version.
+        tool_context (ToolContext): Context used to record the result in the session state.
 
     Returns:
         dict: A dictionary indicating success/failure and the path to the generated code.
               Example: {'status': 'success', 'path': '/path/to/client_sdk', 'message': '...'}
                        {'status': 'error', 'message': '...', 'details': '...'}
     """
-    return _generate_openapi_component("server-stub", spec_file_path, generation_framework, api_name, api_version)
+    result = _generate_openapi_component("server-stub", spec_file_path, generation_framework, api_name, api_version)
+    return _record_generation(tool_context, "server-stub", generation_framework, result)
 
-def generate_client_sdk(spec_file_path: str, generation_framework: str, api_name: str, api_version: str) -> dict:
+def generate_client_sdk(spec_file_path: str, generation_framework: str, api_name: str, api_version: str, tool_context: ToolContext) -> dict:
     """Generates a client-side SDK from an OpenAPI specification using openapi-generator-cli.
 
     Args:
@@ -100,15 +130,17 @@ def generate_client_sdk(spec_file_path: str, generation_framework: str, api_name
         generation_framework (str): The target client language (e.g., "python-flask", "spring", "go-server", "scalatra").
         api_name (str): The name of the API.
         api_version (str): The target API version.
+        tool_context (ToolContext): Context used to record the result in the session state.
 
     Returns:
         dict: A dictionary indicating success/failure and the path to the generated code.
               Example: {'status': 'success', 'path': '/path/to/client_sdk', 'message': '...'}
                        {'status': 'error', 'message': '...', 'details': '...'}
     """
-    return _generate_openapi_component("client-sdk", spec_file_path, generation_framework, api_name, api_version)
+    result = _generate_openapi_component("client-sdk", spec_file_path, generation_framework, api_name, api_version)
+    return _record_generation(tool_context, "client-sdk", generation_framework, result)
 
-def generate_documentation(spec_file_path: str, generation_framework: str, api_name: str, api_version: str):
+def generate_documentation(spec_file_path: str, generation_framework: str, api_name: str, api_version: str, tool_context: ToolContext):
     """Generates a documentation from an OpenAPI specification using openapi-generator-cli.
 
         Args:
@@ -116,16 +148,37 @@ def generate_documentation(spec_file_path: str, generation_framework: str, api_n
             generation_framework (str): The target docs language (e.g., "html2", "markdown", "cwiki", "dynamic-html").
             api_name (str): The name of the API.
             api_version (str): The target API version.
+            tool_context (ToolContext): Context used to record the result in the session state.
 
         Returns:
             dict: A dictionary indicating success/failure and the path to the generated code.
                   Example: {'status': 'success', 'path': '/path/to/client_sdk', 'message': '...'}
                            {'status': 'error', 'message': '...', 'details': '...'}
         """
-    return _generate_openapi_component("documentation", spec_file_path, generation_framework, api_name, api_version)
+    result = _generate_openapi_component("documentation", spec_file_path, generation_framework, api_name, api_version)
+    return _record_generation(tool_context, "documentation", generation_framework, result)
 
 
 class CodeGenerationAgent:
+    @staticmethod
+    def generation_keys() -> List[str]:
+        return [
+            get_generation_key(component, generation_framework)
+            for component, generation_frameworks in GENERATED_FRAMEWORKS.items()
+            for generation_framework in generation_frameworks
+        ]
+
+    @staticmethod
+    def is_completed(state: dict) -> bool:
+        """Whether every component was generated and is still on disk (a restarted container loses the outputs)."""
+        for key in CodeGenerationAgent.generation_keys():
+            generation = state.get(key) or {}
+            if generation.get("status") != "success" or not generation.get("path"):
+                return False
+            if not os.path.isdir(f"{os.getenv('API_REQUIREMENTS_PATH')}/{generation['path']}"):
+                return False
+        return True
+
     @staticmethod
     def get_agent():
         saver = LlmAgent(
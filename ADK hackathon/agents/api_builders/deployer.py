@@ -1,11 +1,14 @@
 import base64
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 import gitlab
 from google.adk.agents import LlmAgent
+from google.adk.tools import ToolContext
 
 GITLAB_URL = os.environ.get("GITLAB_URL", "https://gitlab.com")
 PRIVATE_TOKEN = os.environ.get("GITLAB_PRIVATE_TOKEN")
@@ -16,6 +19,11 @@ COMMIT_MESSAGE = f"Automated: Update {datetime.now().strftime('%Y%m%d%H%M%S')} O
 AUTHOR_NAME = "ADK Agent"
 AUTHOR_EMAIL = "adk-bot@example.com"
 
+MAX_ACTIONS_PER_COMMIT = int(os.environ.get("GITLAB_MAX_ACTIONS_PER_COMMIT", "200"))
+MAX_COMMIT_BYTES = int(os.environ.get("GITLAB_MAX_COMMIT_BYTES", str(20 * 1024 * 1024)))
+READ_WORKERS = int(os.environ.get("GITLAB_READ_WORKERS", "8"))
+READ_BLOCK_SIZE = 1024 * 1024
+
 GENERATED_SERVER_STUB_DIR = "scholarly_reports_server_stub_python_flask_vv1"
 GENERATED_SDK_DIR = "scholarly_reports_client_sdk_python_vv1"
 
@@ -30,72 +38,159 @@ def get_project():
     except gitlab.exceptions.GitlabError as e:
         raise EnvironmentError(f"Error connecting to GitLab or finding project: {e}")
 
-def collect_file_actions(directory_path, action_type="create"):
-    actions = []
+def _git_blob_sha(file_path: Path) -> str:
+    # GitLab's repository tree reports the git blob id of every file, so hashing the local file the same way lets us
+    # know whether it changed without downloading the remote content. The file is hashed in blocks so it is never
+    # loaded in memory.
+    digest = hashlib.sha1(f"blob {file_path.stat().st_size}\0".encode("utf-8"))
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_remote_tree(project, directory_name: str, ref: str = TARGET_BRANCH) -> Dict[str, str]:
+    try:
+        tree = project.repository_tree(path=directory_name, ref=ref, recursive=True, get_all=True)
+    except gitlab.exceptions.GitlabGetError:
+        # The directory (or the branch) does not exist yet, so every local file is new
+        return {}
+    return {item["path"]: item["id"] for item in tree if item["type"] == "blob"}
+
+def _diff_file(file_path: Path, relative_path: str, remote_sha: Optional[str]) -> Optional[dict]:
+    if remote_sha is not None and _git_blob_sha(file_path) == remote_sha:
+        return None
+    return {
+        "action": "create" if remote_sha is None else "update",
+        "file_path": relative_path,
+        "local_path": str(file_path),
+        "size": file_path.stat().st_size,
+    }
+
+def read_file_action(action: dict) -> dict:
+    """Returns the commit action of a collected action, reading the content of the created and updated files."""
+    commit_action = {"action": action["action"], "file_path": action["file_path"]}
+    if action["action"] == "delete":
+        return commit_action
+
+    with open(action["local_path"], "rb") as f:
+        content_bytes = f.read()
+    try:
+        content = None if b'\0' in content_bytes else content_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        content = None
+
+    if content is None:
+        commit_action["content"] = base64.b64encode(content_bytes).decode("utf-8")
+        commit_action["encoding"] = "base64"
+    else:
+        commit_action["content"] = content
+    return commit_action
+
+def collect_file_actions(project, directory_path, ref: str = TARGET_BRANCH):
+    """Collects the create, update and delete actions needed to make `ref` match the local directory.
+
+    Only the paths, sizes and action types are collected, the contents are read by `read_file_action` when the
+    actions are committed.
+    """
     base_path = Path(directory_path)
-    if not base_path.exists() or not base_path.is_dir():
-        print(f"Warning: Directory '{directory_path}' does not exist or is not a directory. Skipping.")
-        return []
+    if not base_path.is_dir():
+        raise FileNotFoundError(f"Directory '{directory_path}' does not exist or is not a directory")
 
-    for file_path in base_path.rglob("*"):
-        if file_path.is_file():
-            relative_path = file_path.relative_to(base_path.parent)  # Get path relative to the root of the repo
+    remote_files = get_remote_tree(project, base_path.name, ref)
+    local_files = {
+        # Get path relative to the root of the repo
+        file_path.relative_to(base_path.parent).as_posix(): file_path
+        for file_path in base_path.rglob("*") if file_path.is_file()
+    }
+
+    actions = []
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        futures = {
+            executor.submit(_diff_file, file_path, relative_path, remote_files.get(relative_path)): relative_path
+            for relative_path, file_path in local_files.items()
+        }
+        for future in as_completed(futures):
+            relative_path = futures[future]
             try:
-                with open(file_path, "rb") as f:
-                    content_bytes = f.read()
-
-                if b'\0' in content_bytes:
-                    content = base64.b64encode(content_bytes).decode("utf-8")
-                    encoding = "base64"
-                else:
-                    content = content_bytes.decode("utf-8")
-                    encoding = "text"
-
-                action = {
-                    "action": action_type,
-                    "file_path": str(relative_path),
-                    "content": content,
-                }
-                if encoding == "base64":
-                    action["encoding"] = "base64"
-                actions.append(action)
-                print(f"Prepared action '{action_type}' for: {relative_path}")
+                action = future.result()
             except Exception as e:
-                print(f"Error processing file {file_path}: {e}")
+                print(f"Error processing file {relative_path}: {e}")
+                continue
+            if action is not None:
+                actions.append(action)
+                print(f"Prepared action '{action['action']}' for: {relative_path}")
+
+    for relative_path in sorted(remote_files.keys() - local_files.keys()):
+        actions.append({"action": "delete", "file_path": relative_path})
+        print(f"Prepared action 'delete' for: {relative_path}")
+
+    actions.sort(key=lambda a: a["file_path"])
     return actions
 
-def automate_gitlab_commit(directories_names: List[str]):
+def chunk_actions(actions: List[dict], max_actions: int = MAX_ACTIONS_PER_COMMIT, max_bytes: int = MAX_COMMIT_BYTES):
+    """Splits the actions in groups small enough to be sent in a single commit."""
+    chunks, current, current_bytes = [], [], 0
+    for action in actions:
+        size = action.get("size", 0)
+        if current and (len(current) >= max_actions or current_bytes + size > max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(action)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def automate_gitlab_commit(directories_names: List[str], tool_context: ToolContext):
     """Commit and merge path in a GitLab project.
 
+    Only the files that differ from the target branch are sent, split in several commits when the change set is large.
+    The content of the files is read one commit at a time.
+
     Parameters:
         - directories_names: List of only directories names to commit (without the absolut path)
+        - tool_context: Context used to record in the session state whether the project is up to date
 
     Returns:
         dict: a dictionary with the commit and merge info
     """
     project = get_project()
     actions = []
-    for directory in directories_names:
-        actions += collect_file_actions(f"{os.getenv('API_REQUIREMENTS_PATH')}/{directory}", action_type="create")
+    try:
+        for directory in directories_names:
+            actions += collect_file_actions(project, f"{os.getenv('API_REQUIREMENTS_PATH')}/{directory}", ref=TARGET_BRANCH)
+    except FileNotFoundError as e:
+        # Committing without the directory would delete it from the project or report a deploy that did not happen
+        return {"commited": False, "message": f"Error collecting the files to commit: {e}"}
 
     if not actions:
-        return {"commited": False, "message": "No files collected for commit"}
+        tool_context.state["gitlab_deployed"] = True
+        return {"commited": False, "message": "No changes found, the GitLab project is already up to date"}
 
     new_branch_name = f"adk-agent-update-{datetime.now().strftime('%Y%m%d%H%M%S')}"
     project.branches.create({'branch': new_branch_name, 'ref': TARGET_BRANCH})
     branch_to_commit_to = new_branch_name
 
     try:
-        commit_data = {
-            'branch': branch_to_commit_to,
-            'commit_message': COMMIT_MESSAGE,
-            'actions': actions,
-            'author_name': AUTHOR_NAME,
-            'author_email': AUTHOR_EMAIL
-        }
-        commit = project.commits.create(commit_data)
-        print(f"Commit created successfully! SHA: {commit.id}")
-        print(f"Commit URL: {project.web_url}/-/commit/{commit.id}")
+        chunks = chunk_actions(actions, MAX_ACTIONS_PER_COMMIT, MAX_COMMIT_BYTES)
+        for i, chunk in enumerate(chunks, start=1):
+            try:
+                with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+                    commit_actions = list(executor.map(read_file_action, chunk))
+            except OSError as e:
+                return {"commited": False, "message": f"Error reading the files to commit: {e}"}
+
+            commit_message = COMMIT_MESSAGE if len(chunks) == 1 else f"{COMMIT_MESSAGE} (part {i}/{len(chunks)})"
+            commit_data = {
+                'branch': branch_to_commit_to,
+                'commit_message': commit_message,
+                'actions': commit_actions,
+                'author_name': AUTHOR_NAME,
+                'author_email': AUTHOR_EMAIL
+            }
+            commit = project.commits.create(commit_data)
+            print(f"Commit created successfully! SHA: {commit.id} ({len(chunk)} actions)")
+            print(f"Commit URL: {project.web_url}/-/commit/{commit.id}")
 
         try:
             pr_title = f"ADK Update: {commit.short_id}"
@@ -108,6 +203,7 @@ def automate_gitlab_commit(directories_names: List[str]):
                 'description': pr_description,
                 'remove_source_branch': True,
             })
+            tool_context.state["gitlab_deployed"] = True
             return {"commited": True, "message": f"Pull Request created successfully. Commit URL: {project.web_url}/-/commit/{commit.id}, Pull Request URL: {mr.web_url}"}
         except gitlab.exceptions.GitlabError as e:
             return {"commited": False, "message": f"Error creating Pull Request: {e}"}
@@ -127,6 +223,10 @@ Set state["gitlab_mr_url"] with the URL of the merge request.
 """
 
 class DeploymentAgent:
+    @staticmethod
+    def is_completed(state: dict) -> bool:
+        return state.get("gitlab_deployed") is True
+
     @staticmethod
     def get_agent():
         return LlmAgent(
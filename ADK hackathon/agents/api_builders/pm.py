@@ -1,9 +1,9 @@
 import os
 
 from google.adk.agents import LlmAgent, SequentialAgent
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.sessions import InMemorySessionService
+from google.adk.tools import ToolContext
 
+from api_builders.checkpoints import CheckpointAgent
 from api_builders.coders import CodeGenerationAgent
 from api_builders.deployer import DeploymentAgent
 from api_builders.swagger import OpenAPIDefinitionAgent
@@ -70,14 +70,16 @@ Ask about expected error responses and their structures.
 Before finalizing, summarize the gathered information and ask the user for final confirmation.
 
 When you have gathered all information and confirmed with the user, generate a single, structured Markdown string 
-gathering all information, and then use the 'api_creator_agent' Agent to build the API passing this specification.
+gathering all information, save it with the `save_api_requirements` tool, and then use the 'api_creator_agent' Agent 
+to build the API passing this specification.
 """
 
-def save_api_requirements(markdown_string: str) -> str:
+def save_api_requirements(markdown_string: str, tool_context: ToolContext) -> str:
     """Saves the Markdown file on the object storage system.
 
     Args:
         markdown_string (str): Markdown string with all API information.
+        tool_context (ToolContext): Context used to keep the requirements in the session state.
 
     Returns:
         str: URL of the saved file.
@@ -86,29 +88,55 @@ def save_api_requirements(markdown_string: str) -> str:
     file_path = f"{os.getenv('API_REQUIREMENTS_PATH')}/api-requirements.md"
     with open(file_path, "w") as f:
         f.write(markdown_string)
+    # The pipeline checkpoints are keyed on the requirements, so a revised API starts a new run
+    tool_context.state["api_requirements"] = markdown_string
     return f"file://{file_path}"
 
-api_creator_agent = SequentialAgent(
-    name="api_creator_agent",
-    description="This agent create API stub, clients, tests, and docs given an API description",
-    sub_agents=[
-        OpenAPIDefinitionAgent.get_agent(),
-        CodeGenerationAgent.get_agent(),
-        DeploymentAgent.get_agent(),
-    ]
-)
+class ApiCreatorAgent:
+    @staticmethod
+    def get_agent():
+        return SequentialAgent(
+            name="api_creator_agent",
+            description="This agent create API stub, clients, tests, and docs given an API description",
+            sub_agents=[
+                CheckpointAgent.wrap(
+                    OpenAPIDefinitionAgent.get_agent(),
+                    ["current_definition", "status"],
+                    input_keys=["api_requirements"],
+                    reset_keys=["status"],
+                    is_completed=lambda state: OpenAPIDefinitionAgent.is_valid_status(state.get("status") or "")
+                ),
+                CheckpointAgent.wrap(
+                    CodeGenerationAgent.get_agent(),
+                    [
+                        "openapi_yaml_file", "stub_directory", "sdk_directories", "docs_directory", "result",
+                        *CodeGenerationAgent.generation_keys(),
+                    ],
+                    input_keys=["current_definition"],
+                    reset_keys=CodeGenerationAgent.generation_keys(),
+                    is_completed=CodeGenerationAgent.is_completed
+                ),
+                CheckpointAgent.wrap(
+                    DeploymentAgent.get_agent(),
+                    ["gitlab_mr_url", "gitlab_deployed"],
+                    input_keys=["current_definition"],
+                    reset_keys=["gitlab_deployed"],
+                    is_completed=DeploymentAgent.is_completed
+                ),
+            ]
+        )
+
+api_creator_agent = ApiCreatorAgent.get_agent()
 
 class ProductManagerAgent:
     @staticmethod
     def get_agent():
-        artifact_service = InMemoryArtifactService()
-        session_service = InMemorySessionService()
-
         return LlmAgent(
             name="product_manager_agent",
             model=os.getenv('LLM_MODEL'),
             description=PRODUCT_MANAGER_DESCRIPTION,
             instruction=PRODUCT_MANAGER_INSTRUCTIONS,
+            tools=[save_api_requirements],
             sub_agents=[api_creator_agent],
             output_key="api_result"
         )
\ No newline at end of file
@@ -58,10 +58,13 @@ and if the status is valid, use `save_yaml_file` tool to save the YAML specifica
 
 class OpenAPIDefinitionAgent(BaseAgent):
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
-        status = ctx.session.state.get("status", "invalid")
-        should_stop = ("is valid" in status.lower())
+        should_stop = OpenAPIDefinitionAgent.is_valid_status(ctx.session.state.get("status", "invalid"))
         yield Event(author=self.name, actions=EventActions(escalate=should_stop))
 
+    @staticmethod
+    def is_valid_status(status: str) -> bool:
+        return "is valid" in status.lower()
+
     @staticmethod
     def get_agent():
         implementor = LlmAgent(
@@ -0,0 +1,124 @@
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Sequence
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+SERVICE_NAME = "api_builders"
+
+# ADK records the agent_run, call_llm and execute_tool spans itself, the LLM response is kept in this attribute
+LLM_RESPONSE_ATTRIBUTE = "gcp.vertex.agent.llm_response"
+
+
+def _to_otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_to_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def get_usage_attributes(span: ReadableSpan) -> Dict[str, int]:
+    """Returns the token counts of an LLM call span, reading them from the recorded response if ADK did not set them."""
+    attributes = span.attributes or {}
+    if "gen_ai.usage.input_tokens" in attributes or LLM_RESPONSE_ATTRIBUTE not in attributes:
+        return {}
+    try:
+        usage = json.loads(attributes[LLM_RESPONSE_ATTRIBUTE]).get("usage_metadata") or {}
+    except (TypeError, ValueError):
+        return {}
+    return {
+        "gen_ai.usage.input_tokens": usage.get("prompt_token_count") or 0,
+        "gen_ai.usage.output_tokens": usage.get("candidates_token_count") or 0,
+    }
+
+
+def _span_to_otlp(span: ReadableSpan) -> dict:
+    attributes = {**(span.attributes or {}), **get_usage_attributes(span)}
+    return {
+        "traceId": format(span.context.trace_id, "032x"),
+        "spanId": format(span.context.span_id, "016x"),
+        "parentSpanId": format(span.parent.span_id, "016x") if span.parent else "",
+        "name": span.name,
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": [{"key": key, "value": _to_otlp_value(value)} for key, value in attributes.items()],
+        "status": {"code": span.status.status_code.value},
+    }
+
+
+class OtlpJsonFileSpanExporter(SpanExporter):
+    """Appends the spans to a file using the OTLP JSON encoding, one export request per line.
+
+    The file can be read by the OpenTelemetry collector `otlpjsonfile` receiver.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        by_resource: Dict[int, tuple] = {}
+        for span in spans:
+            by_resource.setdefault(id(span.resource), (span.resource, []))[1].append(_span_to_otlp(span))
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": key, "value": _to_otlp_value(value)} for key, value in span_resource.attributes.items()
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": otlp_spans}],
+                }
+                for span_resource, otlp_spans in by_resource.values()
+            ]
+        }
+        try:
+            with self._lock, open(self.file_path, "a") as f:
+                f.write(json.dumps(request) + "\n")
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+def get_tracer_provider() -> TracerProvider:
+    """Returns the SDK tracer provider ADK reports its spans to, installing one if `adk web` did not."""
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        trace.set_tracer_provider(provider)
+    return provider
+
+
+@contextmanager
+def subprocess_span(name: str, attributes: Dict[str, Any] = None):
+    """Measures the wall and CPU time of the child processes run inside the block."""
+    with trace.get_tracer(SERVICE_NAME).start_as_current_span(name, attributes=attributes) as span:
+        usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            span.set_attributes({
+                "process.wall_time_ms": (time.perf_counter() - start) * 1000,
+                "process.cpu.user_time_ms": (usage_after.ru_utime - usage_before.ru_utime) * 1000,
+                "process.cpu.system_time_ms": (usage_after.ru_stime - usage_before.ru_stime) * 1000,
+            })
+
+
+if os.getenv("API_TRACE_FILE"):
+    get_tracer_provider().add_span_processor(BatchSpanProcessor(OtlpJsonFileSpanExporter(os.getenv("API_TRACE_FILE"))))
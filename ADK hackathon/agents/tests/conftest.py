@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The agents import `api_builders` as a top-level package, as `adk web` does when it loads this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_MODEL", "fake-llm")
@@ -0,0 +1,53 @@
+import base64
+import hashlib
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+
+class FakeGitlabProject:
+    """In-memory GitLab project with just the API used by the deployer. Merge requests are merged right away."""
+    web_url = "https://gitlab.example.com/benchmark/project"
+    default_branch = "main"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.files: Dict[str, Dict[str, bytes]] = {"main": {}}
+        self.commits_count = 0
+        self.merge_requests: List[dict] = []
+        self.branches = SimpleNamespace(create=self._create_branch)
+        self.commits = SimpleNamespace(create=self._create_commit)
+        self.mergerequests = SimpleNamespace(create=self._create_merge_request)
+
+    def repository_tree(self, path: str, ref: str, recursive: bool = False, get_all: bool = False) -> List[dict]:
+        time.sleep(self.latency)
+        return [
+            {
+                "path": file_path,
+                "type": "blob",
+                "id": hashlib.sha1(f"blob {len(content)}\0".encode("utf-8") + content).hexdigest(),
+            }
+            for file_path, content in self.files[ref].items() if file_path.startswith(f"{path}/")
+        ]
+
+    def _create_branch(self, data: dict):
+        self.files[data["branch"]] = dict(self.files[data["ref"]])
+
+    def _create_commit(self, data: dict):
+        time.sleep(self.latency)
+        files = self.files[data["branch"]]
+        for action in data["actions"]:
+            if action["action"] == "delete":
+                files.pop(action["file_path"])
+            elif action.get("encoding") == "base64":
+                files[action["file_path"]] = base64.b64decode(action["content"])
+            else:
+                files[action["file_path"]] = action["content"].encode("utf-8")
+        self.commits_count += 1
+        sha = hashlib.sha1(f"{data['branch']}-{self.commits_count}".encode("utf-8")).hexdigest()
+        return SimpleNamespace(id=sha, short_id=sha[:8])
+
+    def _create_merge_request(self, data: dict):
+        self.files[data["target_branch"]] = self.files.pop(data["source_branch"])
+        self.merge_requests.append(data)
+        return SimpleNamespace(web_url=f"{self.web_url}/-/merge_requests/{len(self.merge_requests)}")
@@ -0,0 +1,69 @@
+from collections import ChainMap
+from types import SimpleNamespace
+
+import pytest
+
+from api_builders import coders
+from api_builders.coders import CodeGenerationAgent, GENERATED_FRAMEWORKS
+
+
+@pytest.fixture
+def fake_generator(tmp_path, monkeypatch):
+    """Replaces openapi-generator, the frameworks in `failing` fail and the others write their output directory."""
+    failing = set()
+
+    def generate(component, spec_file_path, generation_framework, api_name, api_version):
+        if generation_framework in failing:
+            return {"status": "error", "message": f"Failed to generate {component}"}
+        output_directory = coders.get_output_directory(component, generation_framework, api_name, api_version)
+        (tmp_path / output_directory).mkdir()
+        return {"status": "success", "path": output_directory, "message": "generated"}
+
+    monkeypatch.setenv("API_REQUIREMENTS_PATH", str(tmp_path))
+    monkeypatch.setattr(coders, "_generate_openapi_component", generate)
+    return failing
+
+
+def run_parallel_calls(session_state, write_through):
+    """Calls every generation tool as ADK does for the function calls of a single model response.
+
+    Every call gets its own state delta, and only the delta of the last call is kept in the merged event. With
+    `write_through` the calls also update the session state, as the in-memory state of ADK does.
+    """
+    deltas = []
+    tools = {
+        "server-stub": coders.generate_server_stub,
+        "client-sdk": coders.generate_client_sdk,
+        "documentation": coders.generate_documentation,
+    }
+    for component, generation_frameworks in GENERATED_FRAMEWORKS.items():
+        for generation_framework in generation_frameworks:
+            delta = {}
+            state = ChainMap(delta, session_state)
+            tools[component]("swagger.yaml", generation_framework, "Pet Store", "1.0.0", SimpleNamespace(state=state))
+            if write_through:
+                session_state.update(delta)
+            deltas.append(delta)
+    return {**session_state, **deltas[-1]}
+
+
+@pytest.mark.parametrize("write_through", [True, False])
+def test_failed_parallel_call_is_not_completed(fake_generator, write_through):
+    fake_generator.add("go")
+
+    state = run_parallel_calls({}, write_through)
+
+    assert not CodeGenerationAgent.is_completed(state)
+
+
+def test_successful_calls_are_completed(fake_generator):
+    state = run_parallel_calls({}, write_through=True)
+
+    assert CodeGenerationAgent.is_completed(state)
+
+
+def test_lost_outputs_are_not_completed(fake_generator, tmp_path):
+    state = run_parallel_calls({}, write_through=True)
+    (tmp_path / state[coders.get_generation_key("client-sdk", "ruby")]["path"]).rmdir()
+
+    assert not CodeGenerationAgent.is_completed(state)
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+from api_builders import deployer
+from fakes import FakeGitlabProject
+
+
+def write_files(directory, files):
+    for relative_path, content in files.items():
+        file_path = directory / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(content)
+
+
+def test_collect_file_actions_only_sends_changes(tmp_path):
+    project = FakeGitlabProject()
+    project.files["main"] = {
+        "sdk/same.txt": b"same",
+        "sdk/changed.txt": b"old",
+        "sdk/removed.txt": b"gone",
+        "docs/other.txt": b"not part of the sdk",
+    }
+    write_files(tmp_path, {
+        "sdk/same.txt": b"same",
+        "sdk/changed.txt": b"new",
+        "sdk/nested/new.txt": b"new file",
+        "sdk/binary.bin": b"a\0b",
+    })
+
+    actions = deployer.collect_file_actions(project, tmp_path / "sdk")
+
+    assert [(action["action"], action["file_path"]) for action in actions] == [
+        ("create", "sdk/binary.bin"),
+        ("update", "sdk/changed.txt"),
+        ("create", "sdk/nested/new.txt"),
+        ("delete", "sdk/removed.txt"),
+    ]
+    assert all("content" not in action for action in actions)
+    assert actions[0]["size"] == 3
+
+    binary, changed = deployer.read_file_action(actions[0]), deployer.read_file_action(actions[1])
+    assert binary == {"action": "create", "file_path": "sdk/binary.bin", "content": "YQBi", "encoding": "base64"}
+    assert changed == {"action": "update", "file_path": "sdk/changed.txt", "content": "new"}
+    assert deployer.read_file_action(actions[3]) == {"action": "delete", "file_path": "sdk/removed.txt"}
+
+
+def test_collect_file_actions_without_changes(tmp_path):
+    project = FakeGitlabProject()
+    project.files["main"] = {"sdk/a.txt": b"a", "sdk/b/c.txt": b"c"}
+    write_files(tmp_path, {"sdk/a.txt": b"a", "sdk/b/c.txt": b"c"})
+
+    assert deployer.collect_file_actions(project, tmp_path / "sdk") == []
+
+
+def test_automate_gitlab_commit_in_chunks(tmp_path, monkeypatch):
+    project = FakeGitlabProject()
+    project.files["main"] = {"sdk/removed.txt": b"gone"}
+    local_files = {f"sdk/file_{i}.txt": f"content {i}".encode("utf-8") for i in range(5)}
+    write_files(tmp_path, local_files)
+    monkeypatch.setenv("API_REQUIREMENTS_PATH", str(tmp_path))
+    monkeypatch.setattr(deployer, "get_project", lambda: project)
+    monkeypatch.setattr(deployer, "MAX_ACTIONS_PER_COMMIT", 2)
+
+    tool_context = SimpleNamespace(state={})
+    result = deployer.automate_gitlab_commit(["sdk"], tool_context)
+
+    assert result["commited"]
+    assert tool_context.state["gitlab_deployed"] is True
+    assert project.commits_count == 3
+    assert project.files["main"] == local_files
+
+    rerun_context = SimpleNamespace(state={})
+    rerun = deployer.automate_gitlab_commit(["sdk"], rerun_context)
+
+    assert not rerun["commited"]
+    assert rerun_context.state["gitlab_deployed"] is True
+    assert project.commits_count == 3
+
+
+def test_automate_gitlab_commit_with_missing_directory(tmp_path, monkeypatch):
+    project = FakeGitlabProject()
+    project.files["main"] = {"sdk/a.txt": b"a"}
+    write_files(tmp_path, {"docs/index.html": b"<html></html>"})
+    monkeypatch.setenv("API_REQUIREMENTS_PATH", str(tmp_path))
+    monkeypatch.setattr(deployer, "get_project", lambda: project)
+
+    tool_context = SimpleNamespace(state={})
+    result = deployer.automate_gitlab_commit(["docs", "sdk"], tool_context)
+
+    assert not result["commited"]
+    assert "sdk" in result["message"]
+    assert "gitlab_deployed" not in tool_context.state
+    assert project.commits_count == 0
+    assert project.files["main"] == {"sdk/a.txt": b"a"}
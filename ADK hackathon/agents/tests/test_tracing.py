@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from api_builders.tracing import (
+    LLM_RESPONSE_ATTRIBUTE, OtlpJsonFileSpanExporter, get_tracer_provider, subprocess_span,
+)
+
+
+def test_subprocess_span_is_exported_as_otlp_json(tmp_path):
+    trace_file = tmp_path / "spans.jsonl"
+    span_exporter = InMemorySpanExporter()
+    get_tracer_provider().add_span_processor(SimpleSpanProcessor(span_exporter))
+    get_tracer_provider().add_span_processor(SimpleSpanProcessor(OtlpJsonFileSpanExporter(str(trace_file))))
+
+    with trace.get_tracer("test").start_as_current_span("execute_tool generate_client_sdk") as tool_span:
+        with subprocess_span("openapi_generator", {"openapi.generator": "go"}):
+            subprocess.run([sys.executable, "-c", "sum(range(100000))"], check=True)
+
+    requests = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    spans = {
+        span["name"]: span
+        for request in requests for resource_spans in request["resourceSpans"]
+        for scope_spans in resource_spans["scopeSpans"] for span in scope_spans["spans"]
+    }
+    generator_span = spans["openapi_generator"]
+    attributes = {attribute["key"]: attribute["value"] for attribute in generator_span["attributes"]}
+
+    assert generator_span["parentSpanId"] == format(tool_span.get_span_context().span_id, "016x")
+    assert generator_span["traceId"] == spans["execute_tool generate_client_sdk"]["traceId"]
+    assert attributes["openapi.generator"] == {"stringValue": "go"}
+    assert attributes["process.wall_time_ms"]["doubleValue"] > 0
+    assert "process.cpu.user_time_ms" in attributes
+    assert [span.name for span in span_exporter.get_finished_spans()][-2:] == [
+        "openapi_generator", "execute_tool generate_client_sdk",
+    ]
+
+
+def test_llm_call_tokens_are_read_from_the_response(tmp_path):
+    trace_file = tmp_path / "spans.jsonl"
+    get_tracer_provider().add_span_processor(SimpleSpanProcessor(OtlpJsonFileSpanExporter(str(trace_file))))
+    llm_response = {"usage_metadata": {"prompt_token_count": 120, "candidates_token_count": 30}}
+
+    with trace.get_tracer("test").start_as_current_span("call_llm") as span:
+        span.set_attribute(LLM_RESPONSE_ATTRIBUTE, json.dumps(llm_response))
+
+    exported = json.loads(trace_file.read_text().splitlines()[-1])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    attributes = {attribute["key"]: attribute["value"] for attribute in exported["attributes"]}
+
+    assert attributes["gen_ai.usage.input_tokens"] == {"intValue": "120"}
+    assert attributes["gen_ai.usage.output_tokens"] == {"intValue": "30"}
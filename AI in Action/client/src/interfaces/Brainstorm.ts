@@ -5,6 +5,16 @@ interface Brainstorm {
         title: string
         text: string
     }[]
+    packing?: {
+        token_budget: number
+        estimated_tokens: number
+        total_documents: number
+        included: {id: string | null, title: string}[]
+        duplicates: {id: string | null, title: string}[]
+        clusters: number
+        sampled: number
+        omitted: number
+    }
 }
 
 export default Brainstorm
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 from bson import ObjectId
 from bson.json_util import dumps
 from bson.json_util import loads
@@ -6,8 +6,8 @@ from pymongo.mongo_client import MongoClient
 
 
 class AtlasClient:
-    def __init__(self, atlas_uri: str, dbname: str):
-        self.mongodb_client = MongoClient(atlas_uri)
+    def __init__(self, atlas_uri: str, dbname: str, **client_options):
+        self.mongodb_client = MongoClient(atlas_uri, **client_options)
         self.database = self.mongodb_client[dbname]
 
     def ping(self):
@@ -29,6 +29,20 @@ class AtlasClient:
         collection = self.database[collection_name]
         return list(collection.find(filter=filter_dict, limit=limit))
 
+    def find_batches(self, collection_name: str, filter_dict: Dict[str, Any] | None = None,
+                     projection: Dict[str, Any] | None = None, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        filter_dict = filter_dict or {}
+        collection = self.database[collection_name]
+        cursor = collection.find(filter=filter_dict, projection=projection, batch_size=batch_size)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def vector_search(self, collection_name: str, index_name: str, attr_name: str, embedding_vector: List[float], limit: int = 5):
         collection = self.database[collection_name]
         results = collection.aggregate([
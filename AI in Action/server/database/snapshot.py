@@ -0,0 +1,106 @@
+import contextlib
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+METADATA_COLUMNS = ["id", "title", "authors", "abstract", "categories"]
+
+
+def snapshot_schema(dim: int, metadata: Dict[str, str] | None = None) -> pa.Schema:
+    fields = [pa.field(column, pa.string()) for column in METADATA_COLUMNS]
+    fields.append(pa.field("embedding", pa.list_(pa.float32(), dim)))
+    return pa.schema(fields, metadata={**(metadata or {}), "embedding_dim": str(dim)})
+
+
+def _to_record_batch(docs: List[Dict[str, Any]], schema: pa.Schema, dim: int) -> pa.RecordBatch:
+    columns = [pa.array([str(doc[column]) if doc.get(column) is not None else None for doc in docs], pa.string())
+               for column in METADATA_COLUMNS]
+    embeddings = np.asarray([doc["embedding"] for doc in docs], dtype=np.float32).reshape(-1)
+    columns.append(pa.FixedSizeListArray.from_arrays(pa.array(embeddings, pa.float32()), dim))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def export_snapshot(batches: Iterable[List[Dict[str, Any]]], path: str, collection_name: str = "") -> int:
+    """Writes the documents to a snapshot file, one record batch at a time.
+
+    The format depends on the extension: `.parquet` writes Parquet, anything else an uncompressed Arrow IPC file
+    that can be memory-mapped without copies. Documents without an embedding of the snapshot dimension are skipped.
+
+    Returns:
+        int: Number of documents written.
+    """
+    tmp_path = f"{path}.tmp"
+    writer, schema, dim = None, None, 0
+    written, skipped = 0, 0
+    try:
+        for docs in batches:
+            if writer is None:
+                dim = next((len(doc["embedding"]) for doc in docs if doc.get("embedding")), 0)
+                if dim == 0:
+                    skipped += len(docs)
+                    continue
+                schema = snapshot_schema(dim, {
+                    "collection": collection_name,
+                    "created_at": datetime.now().isoformat(),
+                })
+                if path.endswith(".parquet"):
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                else:
+                    writer = ipc.new_file(tmp_path, schema)
+
+            valid_docs = [doc for doc in docs if doc.get("embedding") and len(doc["embedding"]) == dim]
+            skipped += len(docs) - len(valid_docs)
+            if valid_docs:
+                writer.write_batch(_to_record_batch(valid_docs, schema, dim))
+                written += len(valid_docs)
+                print(f"Exported {written} documents")
+    except BaseException:
+        # Do not leave a partial snapshot behind
+        if writer is not None:
+            with contextlib.suppress(Exception):
+                writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if writer is None:
+        raise ValueError("No documents with an embedding were found, the snapshot was not written")
+    writer.close()
+    os.replace(tmp_path, path)
+    if skipped:
+        print(f"Warning: {skipped} documents without a valid embedding were skipped")
+    return written
+
+
+def load_snapshot(path: str) -> pa.Table:
+    """Loads a snapshot memory-mapping the file, so the columns are only read from disk when they are used."""
+    if path.endswith(".parquet"):
+        return pq.read_table(path, memory_map=True)
+    return ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def iter_embeddings(table: pa.Table) -> Iterator[np.ndarray]:
+    """Yields the embeddings of every chunk as a (rows, dim) float32 matrix that is a view on the Arrow buffers."""
+    dim = table.schema.field("embedding").type.list_size
+    for chunk in table.column("embedding").chunks:
+        yield chunk.flatten().to_numpy(zero_copy_only=True).reshape(-1, dim)
+
+
+def get_embeddings(table: pa.Table) -> np.ndarray:
+    """Returns the embeddings as a (rows, dim) float32 matrix.
+
+    A snapshot has one chunk per exported batch, and the chunks are copied into a single matrix when there are several
+    of them. Use `iter_embeddings` to process the chunks without copies.
+    """
+    dim = table.schema.field("embedding").type.list_size
+    chunks = list(iter_embeddings(table))
+    if len(chunks) == 1:
+        return chunks[0]
+    if not chunks:
+        return np.empty((0, dim), dtype=np.float32)
+    return np.concatenate(chunks)
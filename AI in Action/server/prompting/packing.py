@@ -0,0 +1,122 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Rough size of a token for English text, used instead of calling the tokenizer on every document
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1, norms)
+
+
+def deduplicate(embeddings: np.ndarray, threshold: float) -> np.ndarray:
+    """Returns the mask of the documents to keep, dropping the later copies of near-identical embeddings."""
+    similarity = embeddings @ embeddings.T
+    keep = np.ones(len(embeddings), dtype=bool)
+    for i in range(len(embeddings)):
+        if keep[i]:
+            duplicates = similarity[i] >= threshold
+            duplicates[:i + 1] = False
+            keep &= ~duplicates
+    return keep
+
+
+def kmeans(embeddings: np.ndarray, k: int, iterations: int = 25, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized k-means with k-means++ initialization. Returns the labels and the centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = np.empty((k, embeddings.shape[1]), dtype=embeddings.dtype)
+    centroids[0] = embeddings[rng.integers(len(embeddings))]
+    distances = ((embeddings - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = distances.sum()
+        probabilities = distances / total if total > 0 else None
+        centroids[i] = embeddings[rng.choice(len(embeddings), p=probabilities)]
+        distances = np.minimum(distances, ((embeddings - centroids[i]) ** 2).sum(axis=1))
+
+    squared_norms = (embeddings ** 2).sum(axis=1, keepdims=True)
+    labels = np.zeros(len(embeddings), dtype=int)
+    for _ in range(iterations):
+        distances = squared_norms - 2 * embeddings @ centroids.T + (centroids ** 2).sum(axis=1)
+        labels = distances.argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, embeddings)
+        new_centroids = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+        if np.allclose(new_centroids, centroids):
+            break
+        centroids = new_centroids
+    return labels, centroids
+
+
+def pack_documents(docs: List[Any], token_budget: int, dedup_threshold: float = 0.97,
+                   max_documents: int = 1024) -> Tuple[List[str], Dict[str, Any]]:
+    """Selects the `title: abstract` lines that fit in the token budget.
+
+    Near-identical documents are dropped using their embeddings. When the remaining documents do not fit, they are
+    clustered with k-means and only the document closest to each centroid is used, starting with the largest clusters.
+    Deduplication is quadratic, so when more than `max_documents` documents have an embedding only a uniform sample
+    of `max_documents` of them is deduplicated and clustered, which keeps the packing time bounded. The other documents
+    are still used to fill the budget.
+
+    Returns:
+        The prompt lines and a report with what was included.
+    """
+    lines = [f"{doc.title}: {doc.abstract}" for doc in docs]
+    costs = np.array([estimate_tokens(line) for line in lines])
+    candidates = np.arange(len(docs))
+    duplicates: List[int] = []
+    clusters = 0
+
+    with_embedding = np.array([bool(doc.embedding) for doc in docs], dtype=bool)
+    embedded = candidates[with_embedding]
+    if len(embedded) > max_documents:
+        rng = np.random.default_rng(0)
+        embedded = np.sort(rng.choice(embedded, size=max_documents, replace=False))
+    sampled = len(embedded)
+    others = np.setdiff1d(candidates, embedded)
+
+    if len(embedded) > 1 and len({len(docs[i].embedding) for i in embedded}) == 1:
+        embeddings = _normalize(np.array([docs[i].embedding for i in embedded], dtype=np.float32))
+        keep = deduplicate(embeddings, dedup_threshold)
+        duplicates = embedded[~keep].tolist()
+        embedded, embeddings = embedded[keep], embeddings[keep]
+
+        unique = np.concatenate([embedded, others])
+        if costs[unique].sum() > token_budget and len(embedded) > 1:
+            k = int(min(len(embedded), max(1, token_budget // costs[unique].mean())))
+            labels, centroids = kmeans(embeddings, k)
+            clusters = k
+            representatives = []
+            for cluster in np.argsort(-np.bincount(labels, minlength=k), kind="stable"):
+                members = np.flatnonzero(labels == cluster)
+                if len(members) == 0:
+                    continue
+                distances = ((embeddings[members] - centroids[cluster]) ** 2).sum(axis=1)
+                representatives.append(embedded[members[distances.argmin()]])
+            candidates = np.concatenate([np.array(representatives, dtype=int), others])
+        else:
+            candidates = np.sort(unique)
+
+    included, used_tokens = [], 0
+    for i in candidates.tolist():
+        if used_tokens + costs[i] <= token_budget:
+            included.append(i)
+            used_tokens += int(costs[i])
+
+    report = {
+        "token_budget": token_budget,
+        "estimated_tokens": used_tokens,
+        "total_documents": len(docs),
+        "included": [{"id": docs[i].id, "title": docs[i].title} for i in included],
+        "duplicates": [{"id": docs[i].id, "title": docs[i].title} for i in duplicates],
+        "clusters": clusters,
+        "sampled": sampled,
+        "omitted": len(docs) - len(included),
+    }
+    return [lines[i] for i in included], report
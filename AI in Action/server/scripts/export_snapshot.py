@@ -0,0 +1,28 @@
+import argparse
+import os
+from dotenv import load_dotenv
+from database.mongo import AtlasClient
+from database.snapshot import METADATA_COLUMNS, export_snapshot
+
+
+load_dotenv()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the papers collection to an Arrow or Parquet snapshot")
+    parser.add_argument("--output", default="../data/arxiv-snapshot.arrow")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    atlas_client = AtlasClient(os.getenv("ATLAS_URI"), os.getenv("DB_NAME", "papers"))
+    atlas_client.ping()
+
+    collection_name = os.getenv("COLLECTION_NAME", "arxiv")
+    projection = {"_id": 0, "embedding": 1, **{column: 1 for column in METADATA_COLUMNS}}
+    total = export_snapshot(
+        atlas_client.find_batches(collection_name, projection=projection, batch_size=args.batch_size),
+        args.output,
+        collection_name,
+    )
+    print(f"Snapshot with {total} documents saved in {args.output}")
+    atlas_client.close()
@@ -1,29 +1,79 @@
 import json
 import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import List
+from typing import List, Optional
 
+import httpx
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from google import genai
-from google.genai.types import EmbedContentConfig
-from pydantic import BaseModel
+from google.genai import errors as genai_errors
+from google.genai.types import EmbedContentConfig, GenerateContentConfig, HttpOptions
+import pymongo
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, OperationFailure
+from pydantic import BaseModel, Field, field_validator
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
 from database.mongo import AtlasClient
+from prompting.packing import estimate_tokens, pack_documents
+from upstream.caller import Upstream, UpstreamError, is_transient_error
+
+# Atlas error codes caused by the request itself (BadValue, FailedToParse, TypeMismatch, InvalidOptions), the other
+# operation failures (authentication, missing index, etc.) are server-side problems
+ATLAS_CLIENT_ERROR_CODES = {2, 9, 14, 72}
+
+BRAINSTORM_TOKEN_BUDGET = int(os.getenv("BRAINSTORM_TOKEN_BUDGET", "32000"))
+
+# Deadline (seconds) and hedging of the upstream calls made by every endpoint
+UPSTREAM_POLICIES = {
+    "embedding": {"deadline": float(os.getenv("EMBEDDING_DEADLINE", "5")), "hedge": True},
+    "search": {"deadline": float(os.getenv("SEARCH_DEADLINE", "8")), "hedge": True},
+    "vector_search": {"deadline": float(os.getenv("VECTOR_SEARCH_DEADLINE", "5")), "hedge": True},
+    "relevance": {"deadline": float(os.getenv("RELEVANCE_DEADLINE", "30")), "hedge": True},
+    "brainstorm": {"deadline": float(os.getenv("BRAINSTORM_DEADLINE", "120")), "hedge": False},
+}
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Only an unavailable or overloaded upstream trips the circuit breaker, not a request it rejected."""
+    if isinstance(error, genai_errors.ClientError):
+        return error.code == 429
+    return is_transient_error(error) or isinstance(
+        error, (genai_errors.ServerError, httpx.TransportError, ConnectionFailure, ExecutionTimeout)
+    )
+
+
+def genai_http_options(name: str) -> HttpOptions:
+    # A call that passed its deadline, or a losing hedge, keeps an executor thread busy until the client gives up, so
+    # the client gives up at the endpoint deadline too
+    return HttpOptions(timeout=int(UPSTREAM_POLICIES[name]["deadline"] * 1000))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load the ML model
-    app.state.atlas_client = AtlasClient(os.getenv("ATLAS_URI"), os.getenv("DB_NAME", "papers"))
-    app.state.client = genai.Client(api_key=os.getenv("GOOGLE_CLOUD_APIKEY"))
+    atlas_deadline = max(UPSTREAM_POLICIES["search"]["deadline"], UPSTREAM_POLICIES["vector_search"]["deadline"])
+    app.state.atlas_client = AtlasClient(
+        os.getenv("ATLAS_URI"), os.getenv("DB_NAME", "papers"), timeoutMS=int(atlas_deadline * 1000)
+    )
+    app.state.client = genai.Client(
+        api_key=os.getenv("GOOGLE_CLOUD_APIKEY"),
+        http_options=HttpOptions(timeout=int(max(policy["deadline"] for policy in UPSTREAM_POLICIES.values()) * 1000)),
+    )
+    app.state.upstream_executor = ThreadPoolExecutor(max_workers=int(os.getenv("UPSTREAM_WORKERS", "32")))
+    app.state.upstreams = {
+        name: Upstream(name, app.state.upstream_executor, is_failure=is_upstream_failure, **policy)
+        for name, policy in UPSTREAM_POLICIES.items()
+    }
     yield
     # Clean up the ML models and release the resources
+    app.state.upstream_executor.shutdown(wait=False, cancel_futures=True)
     app.state.atlas_client.close()
 
 class InputEmbedding(BaseModel):
@@ -61,11 +111,20 @@ class BrainstormModel(BaseModel):
     ideas: list[BrainstormIdea]
 
 class BrainstormDocument(BaseModel):
+    id: Optional[str] = None
     title: str
     abstract: str
+    embedding: Optional[List[float]] = None
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def id_to_str(cls, value):
+        # push_data.py loads the ids with pandas, which turns the numeric-looking arXiv ids into floats
+        return str(value) if value is not None else None
 
 class InputBrainstorm(BaseModel):
     docs: List[BrainstormDocument]
+    token_budget: Optional[int] = Field(default=None, gt=0)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -77,6 +136,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(UpstreamError)
+def upstream_error_handler(request: Request, exc: UpstreamError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+@app.exception_handler(genai_errors.ClientError)
+def genai_client_error_handler(request: Request, exc: genai_errors.ClientError):
+    return JSONResponse(status_code=exc.code, content={"detail": exc.message or str(exc)})
+
+@app.exception_handler(OperationFailure)
+def atlas_operation_failure_handler(request: Request, exc: OperationFailure):
+    status_code = 400 if exc.code in ATLAS_CLIENT_ERROR_CODES else 502
+    return JSONResponse(status_code=status_code, content={"detail": str(exc)})
+
 @app.get('/health')
 def health_check():
     return json.dumps({
@@ -84,47 +156,65 @@ def health_check():
         "timestamp": datetime.datetime.now().isoformat()
     })
 
+@app.get('/upstreams')
+def upstreams_stats():
+    return {name: upstream.stats() for name, upstream in app.state.upstreams.items()}
+
 @app.post("/embedding")
 def embedding(input_embedding: InputEmbedding):
-    response = app.state.client.models.embed_content(
-        model=os.getenv("EMBEDDING_GENAI_MODEL_ID", "models/text-embedding-004"),
-        contents=input_embedding.content,
-        config=EmbedContentConfig(
-            task_type="RETRIEVAL_QUERY",
-        ),
-    )
+    def embed():
+        return app.state.client.models.embed_content(
+            model=os.getenv("EMBEDDING_GENAI_MODEL_ID", "models/text-embedding-004"),
+            contents=input_embedding.content,
+            config=EmbedContentConfig(
+                task_type="RETRIEVAL_QUERY",
+                http_options=genai_http_options("embedding"),
+            ),
+        )
+
+    response = app.state.upstreams["embedding"].call(input_embedding.content, embed)
     return {
         "embedding": response.embeddings[0].values
     }
 
 @app.post("/search")
 def vectorSearch(input_search: InputSearch):
-    response = app.state.client.models.embed_content(
-        model=os.getenv("EMBEDDING_GENAI_MODEL_ID", "models/text-embedding-004"),
-        contents=input_search.search_text,
-        config=EmbedContentConfig(
-            task_type="RETRIEVAL_QUERY",
-        ),
-    )
-    embedding_vector =  response.embeddings[0].values
-    print(f"embedding_vector: {embedding_vector}")
-    mongo_result = app.state.atlas_client.vector_search(
-        os.getenv("COLLECTION_NAME"),
-        "vector_index",
-        "embedding",
-        embedding_vector
-    )
+    def search():
+        response = app.state.client.models.embed_content(
+            model=os.getenv("EMBEDDING_GENAI_MODEL_ID", "models/text-embedding-004"),
+            contents=input_search.search_text,
+            config=EmbedContentConfig(
+                task_type="RETRIEVAL_QUERY",
+                http_options=genai_http_options("search"),
+            ),
+        )
+        embedding_vector =  response.embeddings[0].values
+        print(f"embedding_vector: {embedding_vector}")
+        with pymongo.timeout(UPSTREAM_POLICIES["search"]["deadline"]):
+            return app.state.atlas_client.vector_search(
+                os.getenv("COLLECTION_NAME"),
+                "vector_index",
+                "embedding",
+                embedding_vector
+            )
+
+    # Degrade to an empty result list when neither GenAI nor Atlas answer in time
+    mongo_result = app.state.upstreams["search"].call(input_search.search_text, search, fallback=list)
     print(f"mongo_result: {mongo_result}")
     return mongo_result
 
 @app.post("/vectorSearch")
 def vector_search(input_search: InputVectorSearch):
-    mongo_result = app.state.atlas_client.vector_search(
-        os.getenv("COLLECTION_NAME", "arxiv"),
-        "vector_index",
-        "embedding",
-        input_search.embedding,
-    )
+    def search():
+        with pymongo.timeout(UPSTREAM_POLICIES["vector_search"]["deadline"]):
+            return app.state.atlas_client.vector_search(
+                os.getenv("COLLECTION_NAME", "arxiv"),
+                "vector_index",
+                "embedding",
+                input_search.embedding,
+            )
+
+    mongo_result = app.state.upstreams["vector_search"].call(tuple(input_search.embedding), search, fallback=list)
     return mongo_result
 
 @app.post("/relevance")
@@ -136,10 +226,14 @@ def relevance(input_relevance: InputRelevance):
     Why does this paper is relevant? Give me a brief description of the relevance (one paragraph) and use plain text, not Markdown.
     """
 
-    genai_resp = app.state.client.models.generate_content(
-        model="gemini-2.5-flash-preview-05-20",
-        contents=[prompt],
-    )
+    def generate():
+        return app.state.client.models.generate_content(
+            model="gemini-2.5-flash-preview-05-20",
+            contents=[prompt],
+            config=GenerateContentConfig(http_options=genai_http_options("relevance")),
+        )
+
+    genai_resp = app.state.upstreams["relevance"].call(prompt, generate)
     return genai_resp.text
 
 @app.post("/brainstorm")
@@ -154,18 +248,24 @@ def brainstorm(input_brainstorm: InputBrainstorm):
             - Clearly motivated by the limitations or trends found in the referenced papers
         """]
 
-    for doc in input_brainstorm.docs:
-        prompts.append(f"{doc.title}: {doc.abstract}")
-    genai_resp = app.state.client.models.generate_content(
-        model="gemini-2.5-flash-preview-05-20",
-        contents=prompts,
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": BrainstormModel,
-        },
-    )
+    token_budget = min(input_brainstorm.token_budget or BRAINSTORM_TOKEN_BUDGET, BRAINSTORM_TOKEN_BUDGET)
+    doc_prompts, packing = pack_documents(input_brainstorm.docs, max(token_budget - estimate_tokens(prompts[0]), 0))
+    prompts += doc_prompts
+
+    def generate():
+        return app.state.client.models.generate_content(
+            model="gemini-2.5-flash-preview-05-20",
+            contents=prompts,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": BrainstormModel,
+                "http_options": genai_http_options("brainstorm"),
+            },
+        )
+
+    genai_resp = app.state.upstreams["brainstorm"].call(tuple(prompts), generate)
     print(json.loads(genai_resp.text))
-    return json.loads(genai_resp.text)
+    return {**json.loads(genai_resp.text), "packing": packing}
 
 if __name__ == "__main__":
     uvicorn.run(app, host=os.getenv("API_HOST", "localhost"), port=int(os.getenv("API_PORT", "8000")))
\ No newline at end of file
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from prompting.packing import deduplicate, estimate_tokens, kmeans, pack_documents
+
+
+def make_doc(i, embedding, abstract="A short abstract."):
+    return SimpleNamespace(id=str(i), title=f"Paper {i}", abstract=abstract, embedding=embedding)
+
+
+def test_deduplicate_keeps_the_first_copy():
+    embeddings = np.array([[1, 0], [0, 1], [1, 0], [0.999, 0.04]], dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    assert deduplicate(embeddings, 0.97).tolist() == [True, True, False, False]
+
+
+def test_kmeans_separates_clusters():
+    rng = np.random.default_rng(1)
+    embeddings = np.concatenate([rng.normal(0, 0.1, (50, 4)), rng.normal(5, 0.1, (50, 4))]).astype(np.float32)
+
+    labels, centroids = kmeans(embeddings, 2)
+
+    assert len(set(labels[:50])) == 1 and len(set(labels[50:])) == 1
+    assert labels[0] != labels[50]
+    assert centroids.shape == (2, 4)
+
+
+def test_pack_documents_drops_duplicates():
+    docs = [make_doc(0, [1.0, 0.0]), make_doc(1, [0.0, 1.0]), make_doc(2, [1.0, 0.0]), make_doc(3, None)]
+
+    lines, report = pack_documents(docs, 1000)
+
+    assert lines == ["Paper 0: A short abstract.", "Paper 1: A short abstract.", "Paper 3: A short abstract."]
+    assert [doc["id"] for doc in report["duplicates"]] == ["2"]
+    assert report["clusters"] == 0
+    assert report["omitted"] == 1
+
+
+def test_pack_documents_clusters_when_over_budget():
+    rng = np.random.default_rng(2)
+    centers = np.eye(16)[:5]
+    docs = [make_doc(i, (centers[i % 5] + rng.normal(0, 0.1, 16)).tolist(), "x" * 400) for i in range(100)]
+    budget = 6 * estimate_tokens(f"Paper 10: {'x' * 400}")
+
+    lines, report = pack_documents(docs, budget)
+
+    assert report["clusters"] > 0
+    assert report["estimated_tokens"] <= budget
+    assert 0 < len(lines) <= 6
+    # Every topic is represented before any of them gets a second document
+    assert len({int(doc["id"]) % 5 for doc in report["included"]}) == 5
+
+
+def test_pack_documents_keeps_unsampled_documents_that_fit():
+    rng = np.random.default_rng(3)
+    docs = [make_doc(i, rng.normal(0, 1, 8).tolist()) for i in range(2000)]
+
+    lines, report = pack_documents(docs, 1_000_000, max_documents=256)
+
+    assert report["sampled"] == 256
+    assert len(lines) == 2000
+    assert report["omitted"] == 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from database.snapshot import export_snapshot, get_embeddings, iter_embeddings, load_snapshot
+
+
+def make_batches(batches=3, size=4, dim=8):
+    return [
+        [
+            {"id": f"{b}.{i}", "title": f"Paper {b}.{i}", "authors": "A. Author", "abstract": "Abstract",
+             "categories": "cs.LG", "embedding": [float(b * size + i)] * dim}
+            for i in range(size)
+        ]
+        for b in range(batches)
+    ]
+
+
+@pytest.mark.parametrize("extension", ["arrow", "parquet"])
+def test_export_and_load_round_trip(tmp_path, extension):
+    path = str(tmp_path / f"snapshot.{extension}")
+    batches = make_batches()
+    batches[1].append({"id": "no-embedding", "title": "Skipped", "embedding": None})
+
+    written = export_snapshot(iter(batches), path, "papers")
+    table = load_snapshot(path)
+
+    assert written == 12
+    assert table.column("id").to_pylist() == [f"{b}.{i}" for b in range(3) for i in range(4)]
+    assert table.schema.metadata[b"collection"] == b"papers"
+    embeddings = get_embeddings(table)
+    assert embeddings.shape == (12, 8) and embeddings.dtype == np.float32
+    assert embeddings[:, 0].tolist() == list(range(12))
+    assert np.concatenate(list(iter_embeddings(table))).tolist() == embeddings.tolist()
+
+
+def test_single_chunk_embeddings_are_not_copied(tmp_path):
+    path = str(tmp_path / "snapshot.arrow")
+    export_snapshot(iter(make_batches(batches=1)), path)
+    table = load_snapshot(path)
+
+    embeddings = get_embeddings(table)
+
+    assert not embeddings.flags.owndata
+    assert embeddings.ctypes.data == table.column("embedding").chunks[0].values.buffers()[1].address
+
+
+@pytest.mark.parametrize("extension", ["arrow", "parquet"])
+def test_failed_export_removes_the_partial_file(tmp_path, extension):
+    path = tmp_path / f"snapshot.{extension}"
+
+    def failing_batches():
+        yield from make_batches(batches=1)
+        raise ConnectionError("cursor lost")
+
+    with pytest.raises(ConnectionError):
+        export_snapshot(failing_batches(), str(path))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_export_without_embeddings_fails(tmp_path):
+    with pytest.raises(ValueError):
+        export_snapshot(iter([[{"id": "1", "embedding": None}]]), str(tmp_path / "snapshot.arrow"))
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from upstream.caller import Upstream, UpstreamError
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=8)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_identical_concurrent_calls_are_coalesced(executor):
+    upstream = Upstream("test", executor, deadline=2, hedge=False)
+    release, calls = threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=3) as callers:
+        results = [callers.submit(upstream.call, "key", fn) for _ in range(3)]
+        wait_for(lambda: upstream.counters["coalesced"] == 2)
+        release.set()
+
+        assert [result.result() for result in results] == ["result"] * 3
+    assert len(calls) == 1
+
+
+def test_deadline_returns_the_fallback(executor):
+    upstream = Upstream("test", executor, deadline=0.05, hedge=False)
+    release = threading.Event()
+
+    try:
+        assert upstream.call("key", release.wait, fallback=list) == []
+        with pytest.raises(UpstreamError) as error:
+            upstream.call("other", release.wait)
+    finally:
+        release.set()
+
+    assert error.value.status_code == 504
+    assert upstream.counters["timeouts"] == 2
+    assert upstream.counters["degraded"] == 1
+
+
+def test_deadline_returns_the_cached_response(executor):
+    upstream = Upstream("test", executor, deadline=0.05, hedge=False)
+    release = threading.Event()
+
+    assert upstream.call("key", lambda: "cached") == "cached"
+    try:
+        assert upstream.call("key", release.wait, fallback=list) == "cached"
+    finally:
+        release.set()
+    assert upstream.counters["cache_fallbacks"] == 1
+
+
+def test_slow_attempt_is_hedged(executor):
+    upstream = Upstream("test", executor, deadline=2, hedge_min_samples=3)
+    for i in range(3):
+        upstream.call(i, lambda: "fast")
+    release, attempts = threading.Event(), []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait()
+            return "primary"
+        return "hedge"
+
+    try:
+        assert upstream.call("slow", fn) == "hedge"
+    finally:
+        release.set()
+    assert upstream.counters["hedged"] == 1
+    assert upstream.counters["hedge_wins"] == 1
+
+
+def test_circuit_opens_and_recovers(executor):
+    upstream = Upstream("test", executor, deadline=1, hedge=False, failure_threshold=2, reset_timeout=0.05)
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ConnectionError("connection refused")
+
+    for _ in range(2):
+        with pytest.raises(UpstreamError) as error:
+            upstream.call("key", down)
+        assert error.value.status_code == 502
+    assert upstream.stats()["state"] == "open"
+
+    with pytest.raises(UpstreamError) as error:
+        upstream.call("key", down)
+    assert error.value.status_code == 503
+    assert len(calls) == 2
+    assert upstream.counters["short_circuited"] == 1
+
+    # The half-open trial fails and opens the circuit again
+    time.sleep(0.06)
+    with pytest.raises(UpstreamError):
+        upstream.call("key", down)
+    assert upstream.stats()["state"] == "open"
+
+    # A successful trial closes it
+    time.sleep(0.06)
+    assert upstream.call("key", lambda: "up") == "up"
+    assert upstream.stats()["state"] == "closed"
+
+
+def test_request_errors_pass_through(executor):
+    upstream = Upstream("test", executor, deadline=1, hedge=False, failure_threshold=1)
+    assert upstream.call("key", lambda: "cached") == "cached"
+
+    def invalid():
+        raise ValueError("invalid request")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            upstream.call("key", invalid, fallback=list)
+
+    assert upstream.stats()["state"] == "closed"
+    assert upstream.counters["errors"] == 0
+    assert upstream.counters["cache_fallbacks"] == 0
+
+
+def test_custom_failure_predicate(executor):
+    upstream = Upstream("test", executor, deadline=1, hedge=False, failure_threshold=1,
+                        is_failure=lambda error: isinstance(error, RuntimeError))
+
+    def overloaded():
+        raise RuntimeError("503 service unavailable")
+
+    assert upstream.call("key", overloaded, fallback=list) == []
+    assert upstream.stats()["state"] == "open"
+
+
+def test_shutdown_executor_releases_the_half_open_trial():
+    executor = ThreadPoolExecutor(max_workers=1)
+    upstream = Upstream("test", executor, deadline=1, hedge=False, failure_threshold=1, reset_timeout=0.01)
+
+    def down():
+        raise ConnectionError("connection refused")
+
+    with pytest.raises(UpstreamError):
+        upstream.call("key", down)
+    executor.shutdown()
+    time.sleep(0.02)
+
+    with pytest.raises(UpstreamError) as error:
+        upstream.call("key", lambda: "up")
+    assert error.value.status_code == 503
+
+    # The failed trial must not block the next one
+    time.sleep(0.02)
+    with pytest.raises(UpstreamError):
+        upstream.call("key", lambda: "up")
+    assert upstream.counters["short_circuited"] == 0
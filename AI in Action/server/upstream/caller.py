@@ -0,0 +1,199 @@
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Default failure predicate: only timeouts and connection errors mean that the upstream is unavailable."""
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+class Upstream:
+    """Guards the calls of one endpoint to the upstream services (GenAI and Atlas).
+
+    - Identical concurrent calls (same key) share a single upstream call.
+    - Every call has a deadline; when it is reached the caller gets the fallback instead of waiting.
+    - When an attempt takes longer than the observed p95 latency a duplicate (hedged) attempt is sent and the first
+      one to answer wins.
+    - After `failure_threshold` consecutive failures the circuit opens and calls fail fast for `reset_timeout`
+      seconds, then a single trial call is allowed through.
+
+    Only the errors for which `is_failure` returns True (timeouts, connection errors, 5xx answers) count toward the
+    circuit breaker. On such a failure the last successful response for the same key is returned if it is cached, then
+    the `fallback` result if one is given, otherwise an `UpstreamError` is raised. Any other error (an invalid request,
+    a bug in `fn`) is raised to the caller as is.
+    """
+
+    def __init__(self, name: str, executor: ThreadPoolExecutor, deadline: float, hedge: bool = True,
+                 hedge_min_samples: int = 20, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 cache_size: int = 256, is_failure: Callable[[BaseException], bool] = is_transient_error):
+        self.name = name
+        self.executor = executor
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cache_size = cache_size
+        self.is_failure = is_failure
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._latencies = deque(maxlen=200)
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.counters = {
+            "requests": 0, "coalesced": 0, "hedged": 0, "hedge_wins": 0, "successes": 0, "errors": 0,
+            "timeouts": 0, "short_circuited": 0, "cache_fallbacks": 0, "degraded": 0,
+        }
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            return statistics.quantiles(self._latencies, n=20)[-1]
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "state": self._state,
+                "in_flight": len(self._in_flight),
+                "p95_ms": p95 * 1000 if p95 is not None else None,
+                **self.counters,
+            }
+
+    def _allow_request(self) -> bool:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = "half_open"
+            if self._state == "half_open":
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return self._state != "open"
+
+    def _record_success(self, key: Hashable, result: Any, latency: float):
+        with self._lock:
+            self._state = "closed"
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            self._latencies.append(latency)
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.counters["successes"] += 1
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _record_failure(self, counter: str):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+            self.counters[counter] += 1
+
+    def _execute(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if not self._allow_request():
+            self._count("short_circuited")
+            raise UpstreamError(503, f"Upstream '{self.name}' is unavailable (circuit open)")
+
+        start = time.monotonic()
+        hedge_after = self.p95() if self.hedge else None
+        try:
+            primary = self.executor.submit(fn)
+        except RuntimeError as e:
+            # The executor is shut down, release the half-open trial so the circuit does not stay stuck
+            self._record_failure("errors")
+            raise UpstreamError(503, f"Upstream '{self.name}' is unavailable ({e})") from e
+        pending, error = {primary}, None
+        while pending:
+            elapsed = time.monotonic() - start
+            if elapsed >= self.deadline:
+                break
+            timeout = self.deadline - elapsed
+            if hedge_after is not None:
+                timeout = min(timeout, max(hedge_after - elapsed, 0))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    self._record_success(key, future.result(), time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+                if not self.is_failure(error):
+                    # The upstream answered, the request itself is wrong: do not count it and do not retry it
+                    self._release_trial()
+                    raise error
+            if not done and hedge_after is not None:
+                # The primary attempt is slower than usual, race it against a duplicate
+                hedge_after = None
+                try:
+                    pending.add(self.executor.submit(fn))
+                except RuntimeError:
+                    continue
+                self._count("hedged")
+
+        if pending:
+            self._record_failure("timeouts")
+            raise UpstreamError(504, f"Upstream '{self.name}' did not answer in {self.deadline}s")
+        self._record_failure("errors")
+        raise UpstreamError(502, f"Upstream '{self.name}' failed: {error}") from error
+
+    def call(self, key: Hashable, fn: Callable[[], Any], fallback: Optional[Callable[[], Any]] = None) -> Any:
+        self._count("requests")
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if leader:
+            try:
+                future.set_result(self._execute(key, fn))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+        else:
+            self._count("coalesced")
+
+        try:
+            return future.result(timeout=self.deadline)
+        except (UpstreamError, FutureTimeoutError) as e:
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None:
+                self._count("cache_fallbacks")
+                return cached
+            if fallback is not None:
+                self._count("degraded")
+                return fallback()
+            if isinstance(e, UpstreamError):
+                raise
+            raise UpstreamError(504, f"Upstream '{self.name}' did not answer in {self.deadline}s") from e